@@ -1,9 +1,10 @@
 from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 import logging
 import uvicorn
-from .routes import router
+from .middleware import CachedCORSMiddleware, ErrorResponseMiddleware, PathFastPathMiddleware
+from .routes import router, test_service
+from .services.ai_service import AIService
 from config import settings
 
 # Configure logging
@@ -18,45 +19,58 @@ app = FastAPI(
     description="A comprehensive testing framework for AI agents with manual and automated testing capabilities",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
-# Add CORS middleware
+# Convert unhandled exceptions into JSON 500s (pure ASGI, no body buffering)
+app.add_middleware(ErrorResponseMiddleware)
+
+# Add CORS middleware (Starlette's implementation is already pure ASGI and
+# wraps it so error responses still carry CORS headers)
 app.add_middleware(
-    CORSMiddleware,
+    CachedCORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization"],
+    max_age=86400,
 )
 
 # Include routers
 app.include_router(router, prefix="/api/v1")
 
-@app.exception_handler(Exception)
-async def global_exception_handler(request, exc):
-    """Global exception handler"""
-    logging.error(f"Unhandled exception: {str(exc)}")
-    return JSONResponse(
-        status_code=500,
-        content={"detail": "Internal server error", "error": str(exc)}
-    )
+# Probe endpoints bypass the middleware stack entirely (outermost layer)
+_FAST_PATHS = frozenset({"/api/v1/health", "/api/v1/"})
+app.add_middleware(PathFastPathMiddleware, fast_app=app.router, paths=_FAST_PATHS)
 
 @app.on_event("startup")
 async def startup_event():
     """Application startup event"""
     logging.info("AI Agent Testing System starting up...")
+    AIService.open_http_client()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Application shutdown event"""
     logging.info("AI Agent Testing System shutting down...")
+    await AIService.close_http_client()
+    await test_service.close()
 
 if __name__ == "__main__":
+    if settings.WORKERS > 1:
+        logging.warning(
+            f"WORKERS={settings.WORKERS} is unsupported: executions are stored per process, "
+            "so requests may not find executions run by another worker"
+        )
     uvicorn.run(
         "app.main:app",
         host=settings.HOST,
         port=settings.PORT,
-        reload=True,
+        # uvloop when installed (it has no Windows support), asyncio otherwise
+        loop="auto",
+        http="httptools",
+        workers=settings.WORKERS,
+        reload=settings.DEV_MODE,
         log_level=settings.LOG_LEVEL.lower()
     ) 
\ No newline at end of file
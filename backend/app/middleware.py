@@ -0,0 +1,86 @@
+import logging
+import orjson
+from typing import Iterable
+from starlette.middleware.cors import CORSMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+_JSON_HEADERS = [(b"content-type", b"application/json")]
+
+class ErrorResponseMiddleware:
+    """Pure ASGI middleware that turns unhandled exceptions into a JSON 500.
+
+    Wraps ``send`` instead of going through ``BaseHTTPMiddleware`` so request
+    and response bodies are never buffered through an extra task.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as exc:
+            logger.error(f"Unhandled exception: {str(exc)}")
+            # Headers may already be on the wire; then there is nothing sensible to send
+            if not response_started:
+                body = orjson.dumps({"detail": "Internal server error", "error": str(exc)})
+                await send({
+                    "type": "http.response.start",
+                    "status": 500,
+                    "headers": _JSON_HEADERS + [(b"content-length", str(len(body)).encode())]
+                })
+                await send({"type": "http.response.body", "body": body})
+            # Re-raise like Starlette's ServerErrorMiddleware so the server logs the traceback
+            raise
+
+class PathFastPathMiddleware:
+    """Pure ASGI middleware that routes probe traffic straight to the router.
+
+    GET requests for ``paths`` that carry no ``Origin`` header (liveness
+    probes, load balancers) skip the rest of the middleware stack. Browser
+    requests still go through CORS as usual, and any other method takes the
+    full stack so the router's 405 is rendered by the exception middleware.
+    """
+
+    def __init__(self, app: ASGIApp, fast_app: ASGIApp, paths: Iterable[str]):
+        self.app = app
+        self.fast_app = fast_app
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] == "http"
+            and scope["method"] == "GET"
+            and scope["path"] in self.paths
+            and not any(name == b"origin" for name, _ in scope["headers"])
+        ):
+            await self.fast_app(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+class CachedCORSMiddleware(CORSMiddleware):
+    """CORSMiddleware with O(1) origin checks.
+
+    Starlette already joins the allow/expose header strings once in
+    ``__init__``; the remaining per-request cost is the linear
+    ``origin in allow_origins`` scan, so keep the origins in a frozenset.
+    """
+
+    def __init__(self, app: ASGIApp, **kwargs):
+        super().__init__(app, **kwargs)
+        self.allow_origins = frozenset(self.allow_origins)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -26,6 +26,9 @@ class TestCase(BaseModel):
     created_at: datetime = Field(default_factory=datetime.now)
 
 class TestResult(BaseModel):
+    # Results are shared between stored executions, reports and snapshots
+    model_config = ConfigDict(frozen=True)
+    
     id: Optional[str] = None
     test_case_id: str = Field(..., description="Reference to test case")
     actual_response: str = Field(..., description="Actual AI response")
@@ -50,6 +53,8 @@ class TestExecutionRequest(BaseModel):
     model: str = Field("gpt-3.5-turbo", description="AI model to use")
 
 class TestExecutionResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    
     execution_id: str = Field(..., description="Unique execution ID")
     total_tests: int = Field(..., description="Total number of tests")
     passed_tests: int = Field(..., description="Number of passed tests")
@@ -57,6 +62,7 @@ class TestExecutionResponse(BaseModel):
     results: List[TestResult] = Field(..., description="Test results")
     execution_time: float = Field(..., description="Total execution time")
     summary: Dict[str, Any] = Field(..., description="Execution summary")
+    created_at: datetime = Field(default_factory=datetime.now)
 
 class TestReport(BaseModel):
     execution_id: str = Field(..., description="Execution ID")
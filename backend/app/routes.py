@@ -1,8 +1,10 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, Request
+from fastapi.responses import JSONResponse, Response
+from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
+import hashlib
 import logging
+import orjson
 from .models import (
     TestCase, TestResult, TestSuite, TestExecutionRequest, 
     TestExecutionResponse, TestReport, TestCategory
@@ -16,43 +18,75 @@ router = APIRouter()
 # Initialize test service
 test_service = TestService()
 
+# Static payloads are serialized once at import instead of on every request
+_ROOT_BYTES = orjson.dumps({"message": "AI Agent Testing System API", "version": "1.0.0"})
+_HEALTH_BYTES = orjson.dumps({"status": "healthy", "service": "ai-testing-system"})
+_CATEGORIES_BYTES = orjson.dumps({
+    "categories": [
+        {
+            "value": category.value,
+            "name": category.name,
+            "description": category.value.replace("_", " ").title()
+        }
+        for category in TestCategory
+    ]
+})
+# created_at is left out: it is only the import time, and would change the ETag on every restart
+_PREDEFINED_BYTES = orjson.dumps({
+    "test_cases": {
+        category: [case.model_dump(mode="json", exclude={"created_at"}) for case in cases]
+        for category, cases in test_service.get_predefined_test_cases().items()
+    }
+})
+
+_STATIC_CACHE_CONTROL = "public, max-age=3600, immutable"
+_EXECUTION_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def _make_etag(body: bytes) -> str:
+    """Build a strong ETag from a response body"""
+    return '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+
+_CATEGORIES_ETAG = _make_etag(_CATEGORIES_BYTES)
+_PREDEFINED_ETAG = _make_etag(_PREDEFINED_BYTES)
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Check the request's If-None-Match header against an ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))
+
+def _cached_json_response(request: Request, body: bytes, etag: str, cache_control: str) -> Response:
+    """Return a cacheable JSON response, or 304 if the client already has it"""
+    headers = {"Cache-Control": cache_control, "ETag": etag}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @router.get("/")
 async def root():
     """Root endpoint"""
-    return {"message": "AI Agent Testing System API", "version": "1.0.0"}
+    return Response(content=_ROOT_BYTES, media_type="application/json")
 
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "ai-testing-system"}
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
 
 @router.get("/test-categories")
-async def get_test_categories():
+async def get_test_categories(request: Request):
     """Get available test categories"""
-    return {
-        "categories": [
-            {
-                "value": category.value,
-                "name": category.name,
-                "description": category.value.replace("_", " ").title()
-            }
-            for category in TestCategory
-        ]
-    }
+    return _cached_json_response(request, _CATEGORIES_BYTES, _CATEGORIES_ETAG, _STATIC_CACHE_CONTROL)
 
 @router.get("/predefined-test-cases")
-async def get_predefined_test_cases():
+async def get_predefined_test_cases(request: Request):
     """Get predefined test cases for all categories"""
-    try:
-        cases = test_service.get_predefined_test_cases()
-        return {"test_cases": cases}
-    except Exception as e:
-        logger.error(f"Error getting predefined test cases: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to get predefined test cases")
+    return _cached_json_response(request, _PREDEFINED_BYTES, _PREDEFINED_ETAG, _STATIC_CACHE_CONTROL)
 
 @router.post("/execute-tests")
-async def execute_tests(request: TestExecutionRequest):
+async def execute_tests(request: TestExecutionRequest, response: Response):
     """Execute a test suite"""
+    response.headers["Cache-Control"] = "no-store"
     try:
         if not request.api_key:
             raise HTTPException(status_code=400, detail="API key is required")
@@ -72,20 +106,40 @@ async def execute_tests(request: TestExecutionRequest):
         raise HTTPException(status_code=500, detail=f"Failed to execute tests: {str(e)}")
 
 class QuickTestRequest(BaseModel):
+    """Request body schema, used only for the OpenAPI docs"""
     prompt: str
     web_page_url: str
 
-@router.post("/quick-test")
-async def quick_test(request: QuickTestRequest):
+@router.post(
+    "/quick-test",
+    openapi_extra={
+        "requestBody": {
+            "content": {"application/json": {"schema": QuickTestRequest.model_json_schema()}},
+            "required": True
+        }
+    }
+)
+async def quick_test(request: Request):
     """Run a quick single test"""
+    # The body is two plain strings, so read them directly instead of
+    # building a pydantic model per request
     try:
-        if not request.web_page_url:
-            raise HTTPException(status_code=400, detail="Web page URL is required")
-        
-        if not request.prompt:
-            raise HTTPException(status_code=400, detail="Prompt is required")
-        
-        result = await test_service.run_quick_test(request.prompt, request.web_page_url)
+        data = orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Request body must be valid JSON")
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=400, detail="Request body must be a JSON object")
+    
+    web_page_url = data.get("web_page_url")
+    prompt = data.get("prompt")
+    if not web_page_url or not isinstance(web_page_url, str):
+        raise HTTPException(status_code=400, detail="Web page URL is required")
+    
+    if not prompt or not isinstance(prompt, str):
+        raise HTTPException(status_code=400, detail="Prompt is required")
+    
+    try:
+        result = await test_service.run_quick_test(prompt, web_page_url)
         return result
         
     except Exception as e:
@@ -93,22 +147,33 @@ async def quick_test(request: QuickTestRequest):
         raise HTTPException(status_code=500, detail=f"Failed to run quick test: {str(e)}")
 
 @router.get("/executions")
-async def get_all_executions():
+async def get_all_executions(offset: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1)):
     """Get all test executions"""
     try:
-        executions = test_service.get_all_executions()
+        executions = await test_service.get_all_executions(offset, limit)
         return {"executions": executions}
     except Exception as e:
         logger.error(f"Error getting executions: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to get executions")
 
 @router.get("/executions/{execution_id}")
-async def get_execution(execution_id: str):
+async def get_execution(execution_id: str, request: Request, response: Response):
     """Get specific execution result"""
+    # Stored executions never change, so the ID itself is a valid ETag
+    etag = f'"{execution_id}"'
+    headers = {"Cache-Control": _EXECUTION_CACHE_CONTROL, "ETag": etag}
+    
     try:
-        execution = test_service.get_execution_result(execution_id)
+        # Existence is an in-memory check, so a 304 still skips loading results
+        if not test_service.has_execution(execution_id):
+            raise HTTPException(status_code=404, detail="Execution not found")
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        
+        execution = await test_service.get_execution_result(execution_id)
         if not execution:
             raise HTTPException(status_code=404, detail="Execution not found")
+        response.headers.update(headers)
         return execution
     except HTTPException:
         raise
@@ -120,7 +185,7 @@ async def get_execution(execution_id: str):
 async def get_execution_report(execution_id: str):
     """Get detailed test report for an execution"""
     try:
-        report = test_service.generate_test_report(execution_id)
+        report = await test_service.generate_test_report(execution_id)
         return report
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -159,15 +224,15 @@ async def generate_test_suite(
 async def get_system_stats():
     """Get system statistics"""
     try:
-        executions = test_service.get_all_executions()
+        stats = await test_service.get_system_stats()
         
-        total_executions = len(executions)
-        total_tests = sum(exec.total_tests for exec in executions)
-        total_passed = sum(exec.passed_tests for exec in executions)
-        total_failed = sum(exec.failed_tests for exec in executions)
+        total_executions = stats["total_executions"]
+        total_tests = stats["total_tests"]
+        total_passed = stats["total_passed"]
+        total_failed = stats["total_failed"]
         
         avg_success_rate = (total_passed / total_tests * 100) if total_tests > 0 else 0
-        avg_execution_time = sum(exec.execution_time for exec in executions) / total_executions if total_executions > 0 else 0
+        avg_execution_time = stats["total_execution_time"] / total_executions if total_executions > 0 else 0
         
         return {
             "total_executions": total_executions,
@@ -1,52 +1,109 @@
 import asyncio
+import functools
+import re
 import time
-from typing import List, Dict, Any, Optional
-from openai import OpenAI
+from typing import List, Dict, Any, Optional, Tuple
+import httpx
 from ..models import TestCase, TestCategory, TestResult, TestStatus
 from config import settings
 import logging
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# System prompts per test category
+_SYSTEM_PROMPTS = {
+    TestCategory.PROMPT_UNDERSTANDING: "You are a helpful AI assistant. Respond naturally to user queries.",
+    TestCategory.RESPONSE_ACCURACY: "You are a helpful AI assistant. Provide accurate and relevant information.",
+    TestCategory.FALLBACK_HANDLING: "You are a helpful AI assistant. If you don't know something, say so politely.",
+    TestCategory.TASK_EXECUTION: "You are a helpful AI assistant. Execute tasks as requested.",
+    TestCategory.PERFORMANCE: "You are a helpful AI assistant. Provide concise and efficient responses."
+}
+_DEFAULT_SYSTEM_PROMPT = "You are a helpful AI assistant."
+
+# Phrases that indicate the model gracefully declined to answer
+_FALLBACK_INDICATORS = ("i don't know", "i'm not sure", "i can't", "i don't have", "unable to")
+_FALLBACK_RE = re.compile("|".join(map(re.escape, _FALLBACK_INDICATORS)), re.IGNORECASE)
+
+@functools.lru_cache(maxsize=1024)
+def _expected_pattern(expected_response: str) -> re.Pattern:
+    """Compile (once) a case-insensitive literal matcher for an expected response"""
+    return re.compile(re.escape(expected_response), re.IGNORECASE)
+
+class TransientAIError(Exception):
+    """A provider failure worth retrying: 429, 5xx or a transport error"""
+    # Duration of the failed attempt, filled in by test_prompt
+    response_time: float = 0.0
+
 class AIService:
+    # Process-wide HTTP/2 connection pool shared by every AIService instance
+    _HTTP: Optional[httpx.AsyncClient] = None
+    
     def __init__(self, api_key: str, model: str = "qwen/qwen-2.5-72b-instruct:free"):
         self.api_key = api_key
         self.model = model
-        self.client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=api_key,
-        )
+    
+    @classmethod
+    def open_http_client(cls) -> httpx.AsyncClient:
+        """Create the shared OpenRouter client if it does not exist yet"""
+        if cls._HTTP is None or cls._HTTP.is_closed:
+            cls._HTTP = httpx.AsyncClient(
+                base_url="https://openrouter.ai/api/v1",
+                http2=True,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+                timeout=settings.TEST_TIMEOUT,
+                headers={
+                    "Content-Type": "application/json",
+                    "HTTP-Referer": "https://ai-agent-testing-system.com",  # Optional. Site URL for rankings on openrouter.ai.
+                    "X-Title": "AI Agent Testing System",  # Optional. Site title for rankings on openrouter.ai.
+                }
+            )
+        return cls._HTTP
+    
+    @classmethod
+    async def close_http_client(cls):
+        """Close the shared OpenRouter client"""
+        if cls._HTTP is not None:
+            await cls._HTTP.aclose()
+            cls._HTTP = None
+    
+    async def _chat_completion(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """POST a chat completion request and return the decoded body"""
+        try:
+            response = await AIService.open_http_client().post(
+                "/chat/completions",
+                content=orjson.dumps({"model": self.model, "messages": messages}),
+                headers={"Authorization": f"Bearer {self.api_key}"}
+            )
+        except httpx.TransportError as e:
+            raise TransientAIError(str(e)) from e
+        if response.status_code == 429 or response.status_code >= 500:
+            raise TransientAIError(f"Provider returned HTTP {response.status_code}")
+        response.raise_for_status()
+        return orjson.loads(response.content)
     
     async def test_prompt(self, test_case: TestCase) -> TestResult:
         """Execute a single test case against the AI model"""
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         
         try:
             # Prepare the prompt
-            system_prompt = self._get_system_prompt(test_case.category)
+            system_prompt = _SYSTEM_PROMPTS.get(test_case.category, _DEFAULT_SYSTEM_PROMPT)
             
-            response = self.client.chat.completions.create(
-                extra_headers={
-                    "HTTP-Referer": "https://ai-agent-testing-system.com",  # Optional. Site URL for rankings on openrouter.ai.
-                    "X-Title": "AI Agent Testing System",  # Optional. Site title for rankings on openrouter.ai.
-                },
-                extra_body={},
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": test_case.prompt}
-                ]
-            )
+            response = await self._chat_completion([
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": test_case.prompt}
+            ])
             
-            actual_response = response.choices[0].message.content
-            response_time = time.time() - start_time
+            actual_response = response["choices"][0]["message"]["content"] or ""
+            response_time = (time.perf_counter_ns() - start_ns) / 1e9
             
             # Evaluate the response
             status, accuracy_score, error_message = self._evaluate_response(
                 test_case, actual_response
             )
             
-            return TestResult(
+            return TestResult.model_construct(
                 test_case_id=test_case.id or "unknown",
                 actual_response=actual_response,
                 status=status,
@@ -56,50 +113,43 @@ class AIService:
                 metadata={
                     "model": self.model,
                     "category": test_case.category.value,
-                    "tokens_used": response.usage.total_tokens if hasattr(response, 'usage') else None
+                    "tokens_used": (response.get("usage") or {}).get("total_tokens")
                 }
             )
             
+        except TransientAIError as e:
+            # Left to the caller, which decides whether to retry; time the
+            # attempt the same way as a successful one
+            e.response_time = (time.perf_counter_ns() - start_ns) / 1e9
+            raise
         except Exception as e:
             logger.error(f"Error testing prompt: {str(e)}")
-            return TestResult(
+            return TestResult.model_construct(
                 test_case_id=test_case.id or "unknown",
                 actual_response="",
                 status=TestStatus.ERROR,
-                response_time=time.time() - start_time,
+                response_time=(time.perf_counter_ns() - start_ns) / 1e9,
                 error_message=str(e),
                 metadata={"model": self.model, "category": test_case.category.value}
             )
     
-    def _get_system_prompt(self, category: TestCategory) -> str:
-        """Get appropriate system prompt based on test category"""
-        prompts = {
-            TestCategory.PROMPT_UNDERSTANDING: "You are a helpful AI assistant. Respond naturally to user queries.",
-            TestCategory.RESPONSE_ACCURACY: "You are a helpful AI assistant. Provide accurate and relevant information.",
-            TestCategory.FALLBACK_HANDLING: "You are a helpful AI assistant. If you don't know something, say so politely.",
-            TestCategory.TASK_EXECUTION: "You are a helpful AI assistant. Execute tasks as requested.",
-            TestCategory.PERFORMANCE: "You are a helpful AI assistant. Provide concise and efficient responses."
-        }
-        return prompts.get(category, "You are a helpful AI assistant.")
-    
     def _evaluate_response(self, test_case: TestCase, actual_response: str) -> tuple[TestStatus, Optional[float], Optional[str]]:
         """Evaluate the AI response against expected criteria"""
         try:
             # Basic evaluation logic
-            if not actual_response.strip():
+            if not actual_response or actual_response.isspace():
                 return TestStatus.FAILED, 0.0, "Empty response"
             
             # Check if expected response pattern is provided
             if test_case.expected_response:
-                if test_case.expected_response.lower() in actual_response.lower():
+                if _expected_pattern(test_case.expected_response).search(actual_response):
                     return TestStatus.PASSED, 1.0, None
                 else:
                     return TestStatus.FAILED, 0.0, "Response doesn't match expected pattern"
             
             # For categories without specific expectations, use basic heuristics
             if test_case.category == TestCategory.FALLBACK_HANDLING:
-                fallback_indicators = ["i don't know", "i'm not sure", "i can't", "i don't have", "unable to"]
-                if any(indicator in actual_response.lower() for indicator in fallback_indicators):
+                if _FALLBACK_RE.search(actual_response):
                     return TestStatus.PASSED, 0.8, None
                 else:
                     return TestStatus.FAILED, 0.3, "No fallback handling detected"
@@ -112,6 +162,10 @@ class AIService:
     
     async def generate_test_cases(self, category: TestCategory, count: int = 10) -> List[TestCase]:
         """Generate test cases using AI"""
+        # Generation is opt-in; otherwise skip the round-trip entirely
+        if not settings.AI_GENERATION_ENABLED:
+            return self.get_predefined_test_cases(category, count)
+        
         try:
             prompt = f"""
             Generate {count} test cases for AI agent testing in the category: {category.value}
@@ -138,122 +192,123 @@ class AIService:
             ]
             """
             
-            response = self.client.chat.completions.create(
-                extra_headers={
-                    "HTTP-Referer": "https://ai-agent-testing-system.com",
-                    "X-Title": "AI Agent Testing System",
-                },
-                extra_body={},
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a test case generator for AI systems."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            response = await self._chat_completion([
+                {"role": "system", "content": "You are a test case generator for AI systems."},
+                {"role": "user", "content": prompt}
+            ])
             
-            # Parse the response and create test cases
-            content = response.choices[0].message.content
-            # Simple parsing - in production, use proper JSON parsing
-            test_cases = []
-            
-            # For now, return some predefined test cases
-            predefined_cases = self._get_predefined_test_cases(category, count)
-            return predefined_cases
+            # Parse the response and create test cases; models often wrap the
+            # JSON array in prose or a code fence, so take the outermost array
+            content = response["choices"][0]["message"]["content"] or ""
+            items = orjson.loads(content[content.index("["):content.rindex("]") + 1])
+            test_cases = [
+                TestCase(
+                    prompt=item["prompt"],
+                    expected_response=item.get("expected_response") or None,
+                    description=item["description"],
+                    category=category
+                )
+                for item in items[:count]
+            ]
+            return test_cases or self.get_predefined_test_cases(category, count)
             
         except Exception as e:
             logger.error(f"Error generating test cases: {str(e)}")
-            return self._get_predefined_test_cases(category, count)
+            return self.get_predefined_test_cases(category, count)
     
-    def _get_predefined_test_cases(self, category: TestCategory, count: int) -> List[TestCase]:
+    @staticmethod
+    def get_predefined_test_cases(category: TestCategory, count: int) -> List[TestCase]:
         """Get predefined test cases for each category"""
-        cases = {
-            TestCategory.PROMPT_UNDERSTANDING: [
-                TestCase(
-                    prompt="Hello, how are you?",
-                    description="Basic greeting understanding",
-                    category=category
-                ),
-                TestCase(
-                    prompt="What's the weather like?",
-                    description="Ambiguous query handling",
-                    category=category
-                ),
-                TestCase(
-                    prompt="Can you help me with my homework?",
-                    description="Request for assistance",
-                    category=category
-                )
-            ],
-            TestCategory.RESPONSE_ACCURACY: [
-                TestCase(
-                    prompt="What is 2+2?",
-                    expected_response="4",
-                    description="Basic math accuracy",
-                    category=category
-                ),
-                TestCase(
-                    prompt="Who is the current president of the United States?",
-                    description="Factual information accuracy",
-                    category=category
-                ),
-                TestCase(
-                    prompt="What is the capital of France?",
-                    expected_response="Paris",
-                    description="Geographic knowledge",
-                    category=category
-                )
-            ],
-            TestCategory.FALLBACK_HANDLING: [
-                TestCase(
-                    prompt="What is the meaning of life?",
-                    description="Philosophical question handling",
-                    category=category
-                ),
-                TestCase(
-                    prompt="Tell me about the future",
-                    description="Speculative question handling",
-                    category=category
-                ),
-                TestCase(
-                    prompt="What's the secret to eternal youth?",
-                    description="Impossible question handling",
-                    category=category
-                )
-            ],
-            TestCategory.TASK_EXECUTION: [
-                TestCase(
-                    prompt="Write a short poem about cats",
-                    description="Creative task execution",
-                    category=category
-                ),
-                TestCase(
-                    prompt="Explain quantum physics in simple terms",
-                    description="Complex topic explanation",
-                    category=category
-                ),
-                TestCase(
-                    prompt="Give me a recipe for chocolate chip cookies",
-                    description="Instruction provision",
-                    category=category
-                )
-            ],
-            TestCategory.PERFORMANCE: [
-                TestCase(
-                    prompt="Summarize the benefits of exercise",
-                    description="Concise summarization",
-                    category=category
-                ),
-                TestCase(
-                    prompt="List 5 ways to save money",
-                    description="Structured response generation",
-                    category=category
-                ),
-                TestCase(
-                    prompt="Explain photosynthesis in one sentence",
-                    description="Brevity requirement",
-                    category=category
-                )
-            ]
-        }
-        
-        return cases.get(category, [])[:count] 
\ No newline at end of file
+        # Callers mutate cases (execute_test_suite assigns ids), so never hand out the shared ones
+        return [case.model_copy() for case in _PREDEFINED_CASES.get(category, ())[:count]]
+
+# Predefined test cases, built once at import
+_PREDEFINED_CASES: Dict[TestCategory, Tuple[TestCase, ...]] = {
+    TestCategory.PROMPT_UNDERSTANDING: (
+        TestCase(
+            prompt="Hello, how are you?",
+            description="Basic greeting understanding",
+            category=TestCategory.PROMPT_UNDERSTANDING
+        ),
+        TestCase(
+            prompt="What's the weather like?",
+            description="Ambiguous query handling",
+            category=TestCategory.PROMPT_UNDERSTANDING
+        ),
+        TestCase(
+            prompt="Can you help me with my homework?",
+            description="Request for assistance",
+            category=TestCategory.PROMPT_UNDERSTANDING
+        )
+    ),
+    TestCategory.RESPONSE_ACCURACY: (
+        TestCase(
+            prompt="What is 2+2?",
+            expected_response="4",
+            description="Basic math accuracy",
+            category=TestCategory.RESPONSE_ACCURACY
+        ),
+        TestCase(
+            prompt="Who is the current president of the United States?",
+            description="Factual information accuracy",
+            category=TestCategory.RESPONSE_ACCURACY
+        ),
+        TestCase(
+            prompt="What is the capital of France?",
+            expected_response="Paris",
+            description="Geographic knowledge",
+            category=TestCategory.RESPONSE_ACCURACY
+        )
+    ),
+    TestCategory.FALLBACK_HANDLING: (
+        TestCase(
+            prompt="What is the meaning of life?",
+            description="Philosophical question handling",
+            category=TestCategory.FALLBACK_HANDLING
+        ),
+        TestCase(
+            prompt="Tell me about the future",
+            description="Speculative question handling",
+            category=TestCategory.FALLBACK_HANDLING
+        ),
+        TestCase(
+            prompt="What's the secret to eternal youth?",
+            description="Impossible question handling",
+            category=TestCategory.FALLBACK_HANDLING
+        )
+    ),
+    TestCategory.TASK_EXECUTION: (
+        TestCase(
+            prompt="Write a short poem about cats",
+            description="Creative task execution",
+            category=TestCategory.TASK_EXECUTION
+        ),
+        TestCase(
+            prompt="Explain quantum physics in simple terms",
+            description="Complex topic explanation",
+            category=TestCategory.TASK_EXECUTION
+        ),
+        TestCase(
+            prompt="Give me a recipe for chocolate chip cookies",
+            description="Instruction provision",
+            category=TestCategory.TASK_EXECUTION
+        )
+    ),
+    TestCategory.PERFORMANCE: (
+        TestCase(
+            prompt="Summarize the benefits of exercise",
+            description="Concise summarization",
+            category=TestCategory.PERFORMANCE
+        ),
+        TestCase(
+            prompt="List 5 ways to save money",
+            description="Structured response generation",
+            category=TestCategory.PERFORMANCE
+        ),
+        TestCase(
+            prompt="Explain photosynthesis in one sentence",
+            description="Brevity requirement",
+            category=TestCategory.PERFORMANCE
+        )
+    )
+}
\ No newline at end of file
@@ -0,0 +1,149 @@
+import orjson
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+from ..models import TestExecutionResponse, TestResult
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Redis key holding the serialized results of one execution
+_RESULTS_KEY = "ai_testing:results:{}".format
+
+class ExecutionStore:
+    """LRU of stored executions with optional Redis offload of the results.
+    
+    With a Redis client only the summary (counts, timings, breakdown) of
+    each execution stays in memory; the per-test results are written to
+    Redis and loaded back on demand. Without one, whole executions are
+    kept in memory.
+    """
+    
+    def __init__(self, max_items: int, redis_client=None, results_ttl: Optional[int] = None, page_limit: int = 50):
+        self.max_items = max_items
+        self._redis = redis_client
+        self.results_ttl = results_ttl
+        # Most executions whose offloaded results one listing will load
+        self.page_limit = page_limit
+        # Summaries in insertion order, which is the order they are listed in
+        self._summaries: Dict[str, TestExecutionResponse] = {}
+        # Recency order for eviction, kept apart so reads never reorder the listing
+        self._recency: OrderedDict[str, None] = OrderedDict()
+        # Snapshot served by summaries(), rebuilt only after an insert or eviction
+        self._view: Optional[Tuple[TestExecutionResponse, ...]] = None
+        # Last listing page with results attached, keyed by (offset, limit)
+        self._page: Optional[Tuple[Tuple[int, int], Sequence[TestExecutionResponse]]] = None
+    
+    async def put(self, execution: TestExecutionResponse):
+        """Store an execution, offloading its results if Redis is enabled"""
+        if self._redis is not None:
+            try:
+                await self.put_results(execution.execution_id, execution.results)
+                execution = execution.model_copy(update={"results": []})
+            except Exception as e:
+                # Keep the results in memory rather than failing a finished suite
+                logger.error(f"Error offloading results for {execution.execution_id}: {str(e)}")
+        evicted_id = self.put_summary(execution.execution_id, execution)
+        if evicted_id is not None and self._redis is not None:
+            try:
+                await self._redis.delete(_RESULTS_KEY(evicted_id))
+            except Exception as e:
+                # The key's TTL cleans it up eventually
+                logger.error(f"Error deleting results for {evicted_id}: {str(e)}")
+    
+    def put_summary(self, execution_id: str, summary: TestExecutionResponse) -> Optional[str]:
+        """Insert a summary, returning the ID of the evicted entry if any"""
+        evicted_id = None
+        if execution_id not in self._summaries and len(self._summaries) >= self.max_items:
+            evicted_id, _ = self._recency.popitem(last=False)
+            del self._summaries[evicted_id]
+        self._summaries[execution_id] = summary
+        self._recency[execution_id] = None
+        self._recency.move_to_end(execution_id)
+        self._view = None
+        self._page = None
+        return evicted_id
+    
+    async def put_results(self, execution_id: str, results: List[TestResult]):
+        await self._redis.set(
+            _RESULTS_KEY(execution_id),
+            orjson.dumps([result.model_dump() for result in results]),
+            ex=self.results_ttl
+        )
+    
+    def get_summary(self, execution_id: str) -> Optional[TestExecutionResponse]:
+        """Get a stored summary and mark it as recently used"""
+        summary = self._summaries.get(execution_id)
+        if summary is not None:
+            self._recency.move_to_end(execution_id)
+        return summary
+    
+    async def get(self, execution_id: str) -> Optional[TestExecutionResponse]:
+        """Get a stored execution including its results"""
+        summary = self.get_summary(execution_id)
+        if summary is None or self._redis is None or summary.results:
+            # Results that could not be offloaded are still held in memory
+            return summary
+        raw = await self._redis.get(_RESULTS_KEY(execution_id))
+        if raw is None:
+            # The results expired; never serve a summary without its results
+            self._discard(execution_id)
+            return None
+        return self._attach_results(summary, raw)
+    
+    def summaries(self, offset: int = 0, limit: Optional[int] = None) -> Tuple[TestExecutionResponse, ...]:
+        """Get stored summaries in insertion order, optionally paginated"""
+        if self._view is None:
+            self._view = tuple(self._summaries.values())
+        if offset or limit is not None:
+            return self._view[offset:None if limit is None else offset + limit]
+        return self._view
+    
+    async def page(self, offset: int = 0, limit: Optional[int] = None) -> Sequence[TestExecutionResponse]:
+        """Get stored executions with their results, optionally paginated"""
+        if self._redis is None:
+            return self.summaries(offset, limit)
+        
+        if limit is None or limit > self.page_limit:
+            if limit is None and not offset:
+                # Unpaginated listing: keep showing the newest executions
+                offset = max(0, len(self._summaries) - self.page_limit)
+            limit = self.page_limit
+        key = (offset, limit)
+        if self._page is not None and self._page[0] == key:
+            return self._page[1]
+        
+        view = self.summaries()
+        page = await self.with_results(view[offset:offset + limit])
+        if self._view is view:
+            # Only cache if nothing was stored while Redis was being read
+            self._page = (key, page)
+        return page
+    
+    async def with_results(self, summaries: Sequence[TestExecutionResponse]) -> Sequence[TestExecutionResponse]:
+        """Attach offloaded results to summaries in a single round trip"""
+        if self._redis is None or not summaries:
+            return summaries
+        raws = await self._redis.mget([_RESULTS_KEY(summary.execution_id) for summary in summaries])
+        page = []
+        for summary, raw in zip(summaries, raws):
+            if raw is None and not summary.results:
+                # The results expired, so drop the execution rather than list it empty
+                self._discard(summary.execution_id)
+                continue
+            page.append(self._attach_results(summary, raw))
+        return page
+    
+    def _discard(self, execution_id: str):
+        """Forget an execution whose offloaded results are gone"""
+        logger.info(f"Results for execution {execution_id} expired, dropping it")
+        if self._summaries.pop(execution_id, None) is not None:
+            del self._recency[execution_id]
+            self._view = None
+            self._page = None
+    
+    def _attach_results(self, summary: TestExecutionResponse, raw: Optional[bytes]) -> TestExecutionResponse:
+        if raw is None:
+            # Results that could not be offloaded are still held in memory
+            return summary
+        results = [TestResult.model_validate(item) for item in orjson.loads(raw)]
+        return summary.model_copy(update={"results": results})
\ No newline at end of file
@@ -1,53 +1,98 @@
 import asyncio
+import math
 import time
 import uuid
-from typing import List, Dict, Any
+from collections import Counter
+from typing import List, Dict, Any, Optional, Sequence, Callable, Awaitable
 from datetime import datetime
+import redis.asyncio as redis
+from aiolimiter import AsyncLimiter
 from ..models import (
     TestCase, TestResult, TestSuite, TestExecutionRequest, 
     TestExecutionResponse, TestReport, TestStatus, TestCategory
 )
-from .ai_service import AIService
+from .ai_service import AIService, TransientAIError
+from .execution_store import ExecutionStore
 from config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Redis hash holding the process-shared /stats counters
+_STATS_KEY = "ai_testing:stats"
+_STATS_FIELDS = ("total_executions", "total_tests", "total_passed", "total_failed", "total_execution_time")
+
+_MOCK_RESPONSE = "This is a mock response for testing purposes. Please configure your API key in settings."
+
+# Quick tests always use the same model, prompt layout and mock metadata
+_QUICK_MODEL = "qwen/qwen-2.5-72b-instruct:free"
+_QUICK_TEMPLATE = "Web Page: {url}\n\nTest Prompt: {prompt}".format
+_QUICK_MOCK_METADATA = {
+    "model": _QUICK_MODEL,
+    "category": TestCategory.PROMPT_UNDERSTANDING.value,
+    "mock": True
+}
+
+# Predefined test cases are static, so build the per-category lists once
+_PREDEFINED_TEST_CASES: Dict[str, List[TestCase]] = {
+    category.value: AIService.get_predefined_test_cases(category, 5)
+    for category in TestCategory
+}
+
+async def _with_retry(coro_factory: Callable[[], Awaitable[Any]], max_tries: int = 3) -> Any:
+    """Await coro_factory(), retrying transient provider errors with backoff"""
+    for attempt in range(max_tries - 1):
+        try:
+            return await coro_factory()
+        except TransientAIError as e:
+            delay = 0.2 * 2 ** attempt
+            logger.warning(f"Transient AI error, retrying in {delay:.1f}s: {str(e)}")
+            # asyncio.sleep so other test cases keep running during the backoff
+            await asyncio.sleep(delay)
+    return await coro_factory()
+
 class TestService:
     def __init__(self):
-        self.executions: Dict[str, TestExecutionResponse] = {}
+        # Running totals so /stats never rescans stored executions
+        self._stats: Dict[str, float] = dict.fromkeys(_STATS_FIELDS, 0)
+        # Shared counters let /stats agree across uvicorn workers
+        self._redis = redis.from_url(settings.REDIS_URL) if settings.USE_REDIS else None
+        # LRU of stored executions, capped at MAX_STORED_EXECUTIONS; with
+        # Redis enabled only summaries stay in memory
+        self._executions = ExecutionStore(
+            settings.MAX_STORED_EXECUTIONS, self._redis,
+            settings.RESULTS_TTL_SECONDS, settings.EXECUTIONS_PAGE_LIMIT
+        )
+        # Token bucket shared by all suites, sized to the provider's rate limit
+        self._limiter = AsyncLimiter(max_rate=settings.RATE_LIMIT_REQUESTS, time_period=settings.RATE_LIMIT_PERIOD_SECONDS)
+        # Bounds outbound LLM calls across all concurrent suites, not just one
+        self._global_sem = asyncio.Semaphore(settings.GLOBAL_MAX_INFLIGHT)
     
     async def execute_test_suite(self, request: TestExecutionRequest) -> TestExecutionResponse:
         """Execute a complete test suite"""
-        execution_id = str(uuid.uuid4())
-        start_time = time.time()
+        execution_id = uuid.uuid4().hex
+        start_time = time.monotonic()
         
         # Use API key from settings if not provided or if it's a dummy key
         api_key = request.api_key
         if not api_key or api_key == "dummy_key":
             api_key = settings.OPENROUTER_API_KEY or settings.OPENAI_API_KEY
         
-        # Execute all test cases
-        results = []
-        passed_tests = 0
-        failed_tests = 0
+        # One AIService for the whole suite
+        ai_service = AIService(api_key, request.model) if api_key else None
         
-        for i, test_case in enumerate(request.test_cases):
-            logger.info(f"Executing test case {i+1}/{len(request.test_cases)}: {test_case.description}")
-            
-            # Add unique ID to test case if not present
+        # Add unique ID to test cases if not present
+        for test_case in request.test_cases:
             if not test_case.id:
-                test_case.id = str(uuid.uuid4())
-            
-            # Execute the test
-            if api_key:
-                ai_service = AIService(api_key, request.model)
-                result = await ai_service.test_prompt(test_case)
-            else:
-                # Return mock results if no API key is available
-                result = TestResult(
+                test_case.id = uuid.uuid4().hex
+        
+        if ai_service is None:
+            # Return mock results if no API key is available; there is no I/O,
+            # so build them directly instead of fanning out tasks
+            outcomes = [
+                TestResult.model_construct(
                     test_case_id=test_case.id,
-                    actual_response="This is a mock response for testing purposes. Please configure your API key in settings.",
+                    actual_response=_MOCK_RESPONSE,
                     status=TestStatus.PASSED,
                     response_time=0.1,
                     accuracy_score=1.0,
@@ -58,22 +103,42 @@ class TestService:
                         "mock": True
                     }
                 )
+                for test_case in request.test_cases
+            ]
+        else:
+            # Execute all test cases concurrently, capped by MAX_CONCURRENCY
+            semaphore = asyncio.Semaphore(settings.MAX_CONCURRENCY)
+            total = len(request.test_cases)
             
-            results.append(result)
+            async def run_test_case(i: int, test_case: TestCase) -> TestResult:
+                async with semaphore:
+                    logger.info(f"Executing test case {i+1}/{total}: {test_case.description}")
+                    return await self._test_prompt(ai_service, test_case)
             
-            # Update counters
-            if result.status == TestStatus.PASSED:
+            # The rate limiter paces requests, so no per-test delay is needed
+            outcomes = await asyncio.gather(
+                *(run_test_case(i, test_case) for i, test_case in enumerate(request.test_cases)),
+                return_exceptions=True
+            )
+        
+        # Collect results and update counters in a single pass
+        results = []
+        passed_tests = 0
+        response_times = []
+        for test_case, outcome in zip(request.test_cases, outcomes):
+            # A failure in one test case must not abort the rest of the suite
+            if isinstance(outcome, BaseException):
+                outcome = self._error_result(test_case, request.model, outcome)
+            results.append(outcome)
+            if outcome.status == TestStatus.PASSED:
                 passed_tests += 1
-            else:
-                failed_tests += 1
-            
-            # Add small delay between tests to avoid rate limiting
-            await asyncio.sleep(0.1)
+            response_times.append(outcome.response_time)
+        failed_tests = len(results) - passed_tests
         
-        execution_time = time.time() - start_time
+        execution_time = time.monotonic() - start_time
         
         # Create execution response
-        execution_response = TestExecutionResponse(
+        execution_response = TestExecutionResponse.model_construct(
             execution_id=execution_id,
             total_tests=len(request.test_cases),
             passed_tests=passed_tests,
@@ -82,134 +147,192 @@ class TestService:
             execution_time=execution_time,
             summary={
                 "success_rate": (passed_tests / len(request.test_cases)) * 100 if request.test_cases else 0,
-                "average_response_time": sum(r.response_time for r in results) / len(results) if results else 0,
+                "average_response_time": math.fsum(response_times) / len(results) if results else 0,
                 "category_breakdown": self._get_category_breakdown(results),
                 "model_used": request.model
             }
         )
         
-        # Store execution for later retrieval
-        self.executions[execution_id] = execution_response
+        # Store execution for later retrieval, evicting the least recently used
+        await self._executions.put(execution_response)
+        await self._record_stats(execution_response)
         
         return execution_response
     
+    async def _test_prompt(self, ai_service: AIService, test_case: TestCase) -> TestResult:
+        """Run one test case, rate limited and retried on transient errors"""
+        async def attempt() -> TestResult:
+            # Take the global slot first so a rate-limit token is never held waiting
+            async with self._global_sem, self._limiter:
+                return await ai_service.test_prompt(test_case)
+        
+        try:
+            return await _with_retry(attempt)
+        except TransientAIError as e:
+            # Like a success, report the last attempt's duration, excluding backoff and queueing
+            return self._error_result(test_case, ai_service.model, e, e.response_time)
+    
+    async def _record_stats(self, execution: TestExecutionResponse):
+        """Add a finished execution to the /stats counters"""
+        self._stats["total_executions"] += 1
+        self._stats["total_tests"] += execution.total_tests
+        self._stats["total_passed"] += execution.passed_tests
+        self._stats["total_failed"] += execution.failed_tests
+        self._stats["total_execution_time"] += execution.execution_time
+        
+        if self._redis is None:
+            return
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.hincrby(_STATS_KEY, "total_executions", 1)
+                pipe.hincrby(_STATS_KEY, "total_tests", execution.total_tests)
+                pipe.hincrby(_STATS_KEY, "total_passed", execution.passed_tests)
+                pipe.hincrby(_STATS_KEY, "total_failed", execution.failed_tests)
+                pipe.hincrbyfloat(_STATS_KEY, "total_execution_time", execution.execution_time)
+                await pipe.execute()
+        except Exception as e:
+            # Bookkeeping must never fail a suite whose results are already in
+            logger.error(f"Error recording stats in Redis: {str(e)}")
+    
+    async def get_system_stats(self) -> Dict[str, Any]:
+        """Get aggregate counters over all executions"""
+        if self._redis is not None:
+            try:
+                values = await self._redis.hmget(_STATS_KEY, _STATS_FIELDS)
+            except Exception as e:
+                # Fall back to this process's counters rather than failing /stats
+                logger.error(f"Error reading stats from Redis: {str(e)}")
+            else:
+                stats = {field: float(value or 0) for field, value in zip(_STATS_FIELDS, values)}
+                for field in ("total_executions", "total_tests", "total_passed", "total_failed"):
+                    stats[field] = int(stats[field])
+                return stats
+        
+        return dict(self._stats)
+    
+    async def close(self):
+        """Close the Redis connection pool, if one was opened"""
+        if self._redis is not None:
+            await self._redis.aclose()
+    
+    def _error_result(self, test_case: TestCase, model: str, error: BaseException, response_time: float = 0.0) -> TestResult:
+        """Build an ERROR result for a test case that raised"""
+        logger.error(f"Error executing test case {test_case.id}: {str(error)}")
+        return TestResult.model_construct(
+            test_case_id=test_case.id or "unknown",
+            actual_response="",
+            status=TestStatus.ERROR,
+            response_time=response_time,
+            error_message=str(error),
+            metadata={"model": model, "category": test_case.category.value}
+        )
+    
     def _get_category_breakdown(self, results: List[TestResult]) -> Dict[str, int]:
         """Get breakdown of results by category"""
-        breakdown = {}
-        for result in results:
-            category = result.metadata.get("category", "unknown")
-            if category not in breakdown:
-                breakdown[category] = 0
-            breakdown[category] += 1
-        return breakdown
+        return dict(Counter(result.metadata.get("category", "unknown") for result in results))
     
     async def generate_test_suite(self, categories: List[TestCategory], cases_per_category: int = 5) -> TestSuite:
         """Generate a comprehensive test suite"""
-        test_cases = []
-        
         # Use API key from settings
         api_key = settings.OPENROUTER_API_KEY or settings.OPENAI_API_KEY
         
-        for category in categories:
-            if api_key:
-                ai_service = AIService(api_key, "qwen/qwen-2.5-72b-instruct:free")
-                cases = await ai_service.generate_test_cases(category, cases_per_category)
-                test_cases.extend(cases)
-            else:
-                # Use predefined cases if no API key is available
-                ai_service = AIService("dummy_key", "qwen/qwen-2.5-72b-instruct:free")
-                cases = ai_service._get_predefined_test_cases(category, cases_per_category)
-                test_cases.extend(cases)
+        if api_key:
+            ai_service = AIService(api_key, "qwen/qwen-2.5-72b-instruct:free")
+            # Categories are independent requests, so generate them concurrently
+            async def generate(category: TestCategory) -> List[TestCase]:
+                async with self._global_sem:
+                    return await ai_service.generate_test_cases(category, cases_per_category)
+            
+            per_category = await asyncio.gather(*(generate(category) for category in categories))
+        else:
+            # Use predefined cases if no API key is available
+            per_category = [
+                AIService.get_predefined_test_cases(category, cases_per_category)
+                for category in categories
+            ]
+        test_cases = [case for cases in per_category for case in cases]
+        now = datetime.now()
         
         return TestSuite(
-            id=str(uuid.uuid4()),
-            name=f"Generated Test Suite - {datetime.now().strftime('%Y-%m-%d %H:%M')}",
+            id=uuid.uuid4().hex,
+            name=f"Generated Test Suite - {now.strftime('%Y-%m-%d %H:%M')}",
             description=f"Auto-generated test suite with {len(test_cases)} test cases across {len(categories)} categories",
-            test_cases=test_cases
+            test_cases=test_cases,
+            created_at=now
         )
     
-    def get_execution_result(self, execution_id: str) -> TestExecutionResponse:
+    def has_execution(self, execution_id: str) -> bool:
+        """Check whether an execution is stored, without loading its results"""
+        return self._executions.get_summary(execution_id) is not None
+    
+    async def get_execution_result(self, execution_id: str) -> Optional[TestExecutionResponse]:
         """Retrieve execution results by ID"""
-        return self.executions.get(execution_id)
+        return await self._executions.get(execution_id)
     
-    def get_all_executions(self) -> List[TestExecutionResponse]:
-        """Get all stored execution results"""
-        return list(self.executions.values())
+    async def get_all_executions(self, offset: int = 0, limit: Optional[int] = None) -> Sequence[TestExecutionResponse]:
+        """Get stored execution results, optionally paginated"""
+        # Offloaded results are loaded only for a bounded, cached page
+        return await self._executions.page(offset, limit)
     
-    def generate_test_report(self, execution_id: str) -> TestReport:
+    async def generate_test_report(self, execution_id: str) -> TestReport:
         """Generate a detailed test report"""
-        execution = self.executions.get(execution_id)
+        # Results are loaded on demand; the report itself only reads
+        # aggregates precomputed when the suite ran
+        execution = await self.get_execution_result(execution_id)
         if not execution:
             raise ValueError(f"Execution {execution_id} not found")
+        return self._build_report_sync(execution)
+    
+    def _build_report_sync(self, execution: TestExecutionResponse) -> TestReport:
+        """Build a report from a stored execution (pure CPU, no I/O)"""
+        # Aggregates were computed once when the suite ran
+        summary = execution.summary
         
-        # Calculate success rate
-        success_rate = (execution.passed_tests / execution.total_tests) * 100 if execution.total_tests > 0 else 0
-        
-        # Calculate average response time
-        avg_response_time = sum(r.response_time for r in execution.results) / len(execution.results) if execution.results else 0
-        
-        # Get category breakdown
-        category_breakdown = {}
-        for result in execution.results:
-            category = result.metadata.get("category", "unknown")
-            if category not in category_breakdown:
-                category_breakdown[category] = 0
-            category_breakdown[category] += 1
-        
-        return TestReport(
-            execution_id=execution_id,
+        return TestReport.model_construct(
+            execution_id=execution.execution_id,
             test_suite_name="Generated Test Suite",
-            execution_date=datetime.now(),
+            execution_date=execution.created_at,
             total_tests=execution.total_tests,
             passed_tests=execution.passed_tests,
             failed_tests=execution.failed_tests,
-            success_rate=success_rate,
-            average_response_time=avg_response_time,
-            category_breakdown=category_breakdown,
+            success_rate=summary["success_rate"],
+            average_response_time=summary["average_response_time"],
+            category_breakdown=summary["category_breakdown"],
             detailed_results=execution.results
         )
     
     def get_predefined_test_cases(self) -> Dict[str, List[TestCase]]:
         """Get predefined test cases for each category"""
-        cases = {}
-        
-        for category in TestCategory:
-            ai_service = AIService("dummy_key", "qwen/qwen-2.5-72b-instruct:free")
-            cases[category.value] = ai_service._get_predefined_test_cases(category, 5)
-        
-        return cases
+        # Copy the cases themselves, not just the lists; TestCase is mutable
+        return {
+            category: [case.model_copy() for case in cases]
+            for category, cases in _PREDEFINED_TEST_CASES.items()
+        }
     
     async def run_quick_test(self, prompt: str, web_page_url: str) -> TestResult:
         """Run a quick single test"""
-        test_case = TestCase(
-            prompt=prompt,
-            description="Quick test",
-            category=TestCategory.PROMPT_UNDERSTANDING
-        )
-        
         # Use API key from settings or a default one
         api_key = settings.OPENROUTER_API_KEY or settings.OPENAI_API_KEY
         if not api_key:
             # Return a mock result for testing without API key
-            return TestResult(
-                test_case_id=test_case.id or "unknown",
-                actual_response="This is a mock response for testing purposes. Please configure your API key in settings.",
+            return TestResult.model_construct(
+                test_case_id="unknown",
+                actual_response=_MOCK_RESPONSE,
                 status=TestStatus.PASSED,
                 response_time=0.1,
                 accuracy_score=1.0,
                 error_message=None,
-                metadata={
-                    "model": "qwen/qwen-2.5-72b-instruct:free",
-                    "category": test_case.category.value,
-                    "mock": True
-                }
+                metadata=_QUICK_MOCK_METADATA
             )
         
         # Use OpenRouter API key and model for testing
-        ai_service = AIService(api_key, "qwen/qwen-2.5-72b-instruct:free")
+        ai_service = AIService(api_key, _QUICK_MODEL)
         
         # Add web page URL to the prompt context
-        enhanced_prompt = f"Web Page: {web_page_url}\n\nTest Prompt: {prompt}"
-        test_case.prompt = enhanced_prompt
+        test_case = TestCase(
+            prompt=_QUICK_TEMPLATE(url=web_page_url, prompt=prompt),
+            description="Quick test",
+            category=TestCategory.PROMPT_UNDERSTANDING
+        )
         
-        return await ai_service.test_prompt(test_case) 
\ No newline at end of file
+        return await self._test_prompt(ai_service, test_case)
\ No newline at end of file
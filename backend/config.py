@@ -1,39 +1,67 @@
 import os
+from dataclasses import dataclass, field
+from typing import Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
 
+@dataclass(frozen=True, slots=True)
 class Settings:
     # API Configuration
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
-    OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
-    OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
-    OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "qwen/qwen-2.5-72b-instruct:free")
+    # Keys are kept out of repr() so logging the settings can't leak them
+    OPENAI_API_KEY: str = field(default=os.getenv("OPENAI_API_KEY", ""), repr=False)
+    OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+    OPENROUTER_API_KEY: str = field(default=os.getenv("OPENROUTER_API_KEY", ""), repr=False)
+    OPENROUTER_MODEL: str = os.getenv("OPENROUTER_MODEL", "qwen/qwen-2.5-72b-instruct:free")
     
     # Database Configuration
-    DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test_results.db")
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./test_results.db")
     
     # Redis Configuration
-    REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379")
+    USE_REDIS: bool = os.getenv("USE_REDIS", "false").lower() == "true"
+    # Offloaded execution results expire on their own, since keys left by
+    # restarted or other workers are never evicted by this process
+    RESULTS_TTL_SECONDS: int = int(os.getenv("RESULTS_TTL_SECONDS", 7 * 24 * 3600))
+    # Cap on executions whose results one /executions call loads from Redis
+    EXECUTIONS_PAGE_LIMIT: int = int(os.getenv("EXECUTIONS_PAGE_LIMIT", 50))
     
     # Server Configuration
-    HOST = os.getenv("HOST", "0.0.0.0")
-    PORT = int(os.getenv("PORT", 8000))
+    HOST: str = os.getenv("HOST", "0.0.0.0")
+    PORT: int = int(os.getenv("PORT", 8000))
+    # More than one worker is unsupported: each process keeps its own index of
+    # executions, even when their results are offloaded to Redis
+    WORKERS: int = int(os.getenv("WORKERS", 1))
+    DEV_MODE: bool = os.getenv("DEV_MODE", "false").lower() == "true"
     
     # CORS Configuration
-    CORS_ORIGINS = [
+    CORS_ORIGINS: Tuple[str, ...] = (
         "http://localhost:3000",
         "http://localhost:5173",
         "http://127.0.0.1:3000",
         "http://127.0.0.1:5173",
         "http://192.168.68.126:3000",
-    ]
+    )
     
     # Test Configuration
-    MAX_TEST_CASES = int(os.getenv("MAX_TEST_CASES", 100))
-    TEST_TIMEOUT = int(os.getenv("TEST_TIMEOUT", 30))
+    MAX_TEST_CASES: int = int(os.getenv("MAX_TEST_CASES", 100))
+    TEST_TIMEOUT: int = int(os.getenv("TEST_TIMEOUT", 30))
+    MAX_CONCURRENCY: int = int(os.getenv("MAX_CONCURRENCY", 10))
+    # Process-wide cap on in-flight LLM calls; matches the shared HTTP pool size
+    GLOBAL_MAX_INFLIGHT: int = int(os.getenv("GLOBAL_MAX_INFLIGHT", 100))
+    # Provider rate limit as a request count per period, so per-minute limits
+    # (e.g. 20 per 60s on :free models) can be expressed without fractions
+    RATE_LIMIT_REQUESTS: int = int(os.getenv("RATE_LIMIT_REQUESTS", 20))
+    RATE_LIMIT_PERIOD_SECONDS: float = float(os.getenv("RATE_LIMIT_PERIOD_SECONDS", 1))
+    MAX_STORED_EXECUTIONS: int = int(os.getenv("MAX_STORED_EXECUTIONS", 1000))
+    AI_GENERATION_ENABLED: bool = os.getenv("AI_GENERATION_ENABLED", "false").lower() == "true"
     
     # Logging Configuration
-    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    
+    def __post_init__(self):
+        # AsyncLimiter can't hand out a token from a bucket smaller than one
+        if self.RATE_LIMIT_REQUESTS < 1 or self.RATE_LIMIT_PERIOD_SECONDS <= 0:
+            raise ValueError("RATE_LIMIT_REQUESTS must be at least 1 and RATE_LIMIT_PERIOD_SECONDS positive")
 
 settings = Settings() 
\ No newline at end of file